@@ -3,20 +3,35 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.responses import JSONResponse
 import os
 from fastapi import UploadFile, File, HTTPException
+import numpy as np
 import pandas as pd
 import tempfile
 import shutil
 import traceback
 from fastapi import UploadFile, File, HTTPException, BackgroundTasks, Query
 from pydantic import BaseModel
-from typing import Dict, Any, Optional
-from .solver import solve_subset_selection
+from typing import Dict, Any, Optional, List, Tuple, Iterable, Iterator
+from .solver import solve_subset_selection, scale_amounts
 from fastapi.responses import FileResponse
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+import asyncio
+import threading
 import uuid
-import json
+import orjson
+import xlsxwriter
+import stat
+import aiofiles
+import aiofiles.os
 from datetime import datetime
-from pathlib import Path
+
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pacsv
+except ImportError:  # pyarrow is optional; fall back to pandas' C parser
+    pacsv = None
 
 app = FastAPI()
 
@@ -24,6 +39,75 @@ app = FastAPI()
 RESULTS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'results'))
 os.makedirs(RESULTS_DIR, exist_ok=True)
 
+# Dollar amounts are handed to the solver as integer cents
+SCALE = 100
+
+# Columns of the per-employee results and the dtypes they are built with, so
+# pandas does not have to infer them from every record
+RES_COLS = ('employee_id', 'eligible_est', 'selected', 'selected_sum', 'abs_error',
+            'solver_status', 'predicted_contribution', 'within_tolerance')
+RES_DTYPES = {
+    'eligible_est': 'float64',
+    'selected_sum': 'float64',
+    'abs_error': 'float64',
+    'predicted_contribution': 'float64',
+    'within_tolerance': 'bool',
+}
+# Solver-produced text columns of the results, read back verbatim for the
+# xlsx 'results' sheet (employee_id keeps the type pandas infers, as the input does)
+RES_TEXT_DTYPES = {'selected': str, 'solver_status': str}
+
+# Uploads with more rows than this are not echoed into an 'input' sheet of the
+# xlsx result; the original file is stored next to the result instead
+INPUT_SHEET_MAX_ROWS = 10_000
+
+# xlsxwriter options for /infer_file workbooks; dates match pandas' default
+XLSX_OPTIONS = {
+    'constant_memory': True,
+    'strings_to_numbers': False,
+    'nan_inf_to_errors': True,
+    'default_date_format': 'yyyy-mm-dd hh:mm:ss',
+}
+
+# Worker processes used by /infer_file to solve rows in parallel. Created
+# lazily so importing the app does not fork; each worker keeps its own solve
+# cache across requests.
+BATCH_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+BATCH_CHUNKSIZE = 32
+# Rows parsed and solved per chunk in /infer_file; bounds peak memory on
+# large uploads
+BATCH_ROWS = 50_000
+_pool: Optional[ProcessPoolExecutor] = None
+# _get_pool runs on executor threads; concurrent requests must not each
+# create (and leak) a pool
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=BATCH_WORKERS)
+        return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor) -> None:
+    """Drop a broken pool (a worker died) so the next request gets a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+@app.on_event('shutdown')
+def _shutdown_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
 
 @app.get('/health')
 async def health():
@@ -45,6 +129,63 @@ else:
         return {'status': 'frontend not built'}
 
 
+def _read_csv(source) -> pd.DataFrame:
+    """Parse a CSV from a path or binary file object with pyarrow's
+    multi-threaded reader, falling back to pandas when pyarrow is missing.
+
+    Columns pyarrow infers as dates/times (e.g. an ISO `period`) are kept as
+    text like pandas does, so previews stay JSON-serializable, and repeated
+    header names are suffixed like pandas' ('REG', 'REG.1').
+    """
+    if pacsv is None:
+        return pd.read_csv(source)
+    read_options = pacsv.ReadOptions(use_threads=True, block_size=8 << 20)
+    start = source.tell() if hasattr(source, 'seek') else None
+    table = pacsv.read_csv(source, read_options=read_options)
+    temporal = {f.name: pa.string() for f in table.schema if pa.types.is_temporal(f.type)}
+    if temporal:
+        # pyarrow has no switch to disable temporal inference; re-read with
+        # those columns pinned to string so the original cell text is kept
+        if start is not None:
+            source.seek(start)
+        table = pacsv.read_csv(source, read_options=read_options,
+                               convert_options=pacsv.ConvertOptions(column_types=temporal))
+    if len(set(table.column_names)) < table.num_columns:
+        table = table.rename_columns(_dedup_names(table.column_names))
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def _dedup_names(names: List[str]) -> List[str]:
+    """Rename repeated column names the way pd.read_csv does ('REG', 'REG.1', ...)."""
+    header = set(names)
+    counts: Dict[str, int] = {}
+    out = []
+    for name in names:
+        base, n = name, counts.get(name, 0)
+        while n > 0:
+            # skip suffixes that another header cell already uses
+            counts[base] = n + 1
+            name = f'{base}.{n}'
+            n = n + 1 if name in header else counts.get(name, 0)
+        out.append(name)
+        counts[name] = n + 1
+    return out
+
+
+def _read_excel(source, filename: str) -> pd.DataFrame:
+    """Parse an Excel upload (path or binary file object), preferring the
+    Rust-backed calamine engine.
+
+    Falls back to openpyxl (xlsx) / xlrd (xls) when python-calamine is not
+    installed. Nullable dtypes keep numeric columns with blanks out of object.
+    """
+    try:
+        return pd.read_excel(source, engine='calamine', dtype_backend='numpy_nullable')
+    except ImportError:
+        engine = 'xlrd' if filename.endswith('.xls') else 'openpyxl'
+        return pd.read_excel(source, engine=engine, dtype_backend='numpy_nullable')
+
+
 @app.post('/upload')
 async def upload_file(file: UploadFile = File(...)):
     """Accept CSV and Excel files, return a small preview and column list.
@@ -55,45 +196,78 @@ async def upload_file(file: UploadFile = File(...)):
     if not filename.endswith(('.csv', '.xls', '.xlsx')):
         raise HTTPException(status_code=400, detail='Unsupported file type; only CSV/XLS/XLSX accepted')
 
-    # Save upload to a temporary file then let pandas parse it
-    tmp = None
     try:
-        with tempfile.NamedTemporaryFile(delete=False) as tmpf:
-            tmp = tmpf.name
-            shutil.copyfileobj(file.file, tmpf)
-
-        # parse with pandas
+        # Parse straight from the upload; Starlette already spools it in
+        # memory (spilling to disk only when large), so no temp copy is made
         if filename.endswith('.csv'):
-            df = pd.read_csv(tmp)
+            df = _read_csv(file.file)
         else:
-            df = pd.read_excel(tmp, engine='openpyxl')
+            df = _read_excel(file.file, filename)
 
-        preview = df.head(5).fillna('').to_dict(orient='records')
+        # object dtype so nullable (Int64/Float64) columns accept '' for blanks
+        head = df.head(5).astype(object)
+        preview = head.where(head.notna(), '').to_dict(orient='records')
         columns = list(df.columns)
         rows = int(len(df))
         return JSONResponse({'filename': file.filename, 'rows': rows, 'columns': columns, 'preview': preview})
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=400, detail=f'Failed to parse uploaded file: {e}')
-    finally:
-        try:
-            if tmp and os.path.exists(tmp):
-                os.unlink(tmp)
-        except Exception:
-            pass
+
+
+# Parsed metadata keyed by path -> ((st_mtime_ns, st_size), meta or None if
+# unparsable), so /results only re-reads files that changed since the last
+# listing. The size is part of the key because a file caught mid-write can
+# share its final mtime on coarse-timestamp filesystems.
+_meta_cache: Dict[str, Tuple[Tuple[int, int], Optional[Dict[str, Any]]]] = {}
+
+
+def _scan_meta_files() -> List[Tuple[str, Tuple[int, int]]]:
+    """Blocking helper: (path, (st_mtime_ns, st_size)) of each metadata file
+    in RESULTS_DIR."""
+    found = []
+    with os.scandir(RESULTS_DIR) as it:
+        for entry in it:
+            if not entry.name.endswith('.json'):
+                continue
+            try:
+                if not entry.is_file():
+                    continue
+                st = entry.stat()
+            except OSError:
+                continue
+            found.append((entry.path, (st.st_mtime_ns, st.st_size)))
+    return found
 
 
 @app.get('/results')
 async def list_results():
     """List persisted result files and metadata."""
     metas = []
-    for p in Path(RESULTS_DIR).glob('*.json'):
-        try:
-            with open(p, 'r') as fh:
-                m = json.load(fh)
-                metas.append(m)
-        except Exception:
-            continue
+    # listing and stat-ing the directory blocks; do it all off the event loop
+    loop = asyncio.get_running_loop()
+    entries = await loop.run_in_executor(None, _scan_meta_files)
+    seen = set()
+    for path, version in entries:
+        seen.add(path)
+        cached = _meta_cache.get(path)
+        if cached and cached[0] == version:
+            m = cached[1]
+        else:
+            try:
+                async with aiofiles.open(path, 'rb') as fh:
+                    m = orjson.loads(await fh.read())
+            except orjson.JSONDecodeError:
+                # remember unreadable files too, until they change
+                m = None
+            except OSError:
+                continue
+            _meta_cache[path] = (version, m)
+        if m is not None:
+            metas.append(m)
+    # drop cache entries for files that have been removed
+    for path in _meta_cache.keys() - seen:
+        del _meta_cache[path]
     # sort by created_at desc
     metas.sort(key=lambda m: m.get('created_at', ''), reverse=True)
     return JSONResponse({'results': metas})
@@ -104,14 +278,20 @@ async def get_result(result_id: str):
     """Download a persisted result file by its id."""
     # find matching metadata
     meta_path = os.path.join(RESULTS_DIR, f"{result_id}.json")
-    if not os.path.exists(meta_path):
+    try:
+        async with aiofiles.open(meta_path, 'rb') as fh:
+            meta = orjson.loads(await fh.read())
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail='result not found')
-    with open(meta_path, 'r') as fh:
-        meta = json.load(fh)
     stored = os.path.join(RESULTS_DIR, meta.get('stored_name'))
-    if not os.path.exists(stored):
+    try:
+        st = await aiofiles.os.stat(stored)
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail='file not found')
-    return FileResponse(stored, filename=meta.get('filename'))
+    if not stat.S_ISREG(st.st_mode):
+        raise HTTPException(status_code=404, detail='file not found')
+    # hand over the stat so Starlette does not stat the file again
+    return FileResponse(stored, filename=meta.get('filename'), stat_result=st)
 
 
 class InferRequest(BaseModel):
@@ -121,6 +301,8 @@ class InferRequest(BaseModel):
     time_limit_seconds: Optional[float] = 5.0
     max_candidates: Optional[int] = 50
     tolerance_pct: Optional[float] = 0.03
+    relative_gap_limit: float = 0.01
+    absolute_gap_scaled: int = 100
 
 
 @app.post('/infer_row')
@@ -133,7 +315,9 @@ async def infer_row(req: InferRequest):
       contribution_rate: 0.03,
       time_limit_seconds: 5.0,
       max_candidates: 20,
-      tolerance_pct: 0.03
+      tolerance_pct: 0.03,
+      relative_gap_limit: 0.01,
+      absolute_gap_scaled: 100
     }
 
     Returns solver result and a boolean `within_tolerance` indicating whether
@@ -146,11 +330,13 @@ async def infer_row(req: InferRequest):
     # Estimate eligible compensation
     eligible_est = req.contribution_amount / req.contribution_rate
 
-    # Filter zero/negative values and run solver
-    values = {k: float(v) for k, v in req.values.items()}
+    # Scale values/target to cents and run solver (zero values are dropped)
+    names = list(req.values)
+    scaled_vals = scale_amounts(list(req.values.values()), SCALE)
 
     # run solver
-    sol = solve_subset_selection(values, eligible_est, scale=100, time_limit_seconds=req.time_limit_seconds, max_candidates=req.max_candidates)
+    sol = solve_subset_selection(names, scaled_vals, int(round(eligible_est * SCALE)), scale=SCALE, time_limit_seconds=req.time_limit_seconds, max_candidates=req.max_candidates,
+                                 relative_gap_limit=req.relative_gap_limit, absolute_gap_scaled=req.absolute_gap_scaled)
 
     within_tol = False
     try:
@@ -169,12 +355,173 @@ async def infer_row(req: InferRequest):
         'within_tolerance': within_tol,
     })
 
+def _numeric_array(df: pd.DataFrame, cols) -> np.ndarray:
+    """Extract `cols` as a float64 array, coercing blanks/non-numeric cells to 0."""
+    frame = df.reindex(columns=cols).apply(pd.to_numeric, errors='coerce')
+    return frame.fillna(0.0).to_numpy(dtype=np.float64)
+
+
+def _solve_row(payload: Tuple[Any, np.ndarray, Optional[float], int, float, float, float], *,
+               paycode_cols: List[str], time_limit_seconds: float, max_candidates: int,
+               relative_gap_limit: float, absolute_gap_scaled: int) -> Tuple[Tuple, List[str]]:
+    """Solve a single payroll row; runs inside a worker process.
+
+    `payload` is (employee_id, paycode values in cents aligned with
+    `paycode_cols`, eligible_est or None to skip, eligible_est in cents,
+    contribution_amount, contribution_rate, tolerance bound), as built by
+    `_row_payloads`. Returns the per-employee result record (a tuple ordered
+    as `RES_COLS`) and the list of selected paycodes.
+    """
+    employee_id, row_scaled, eligible_est, scaled_target, contrib_amt, contrib_rate, tol_bound = payload
+
+    if eligible_est is None:
+        sol = {'status': 'SKIP', 'selected': [], 'selected_sum': 0.0}
+        predicted_contrib = None
+        within_tol = False
+    else:
+        # the pool already uses the available cores; keep CP-SAT single-threaded
+        sol = solve_subset_selection(paycode_cols, row_scaled, scaled_target,
+                                     scale=SCALE, time_limit_seconds=time_limit_seconds,
+                                     max_candidates=max_candidates, num_search_workers=1,
+                                     relative_gap_limit=relative_gap_limit,
+                                     absolute_gap_scaled=absolute_gap_scaled)
+        predicted_contrib = sol['selected_sum'] * contrib_rate
+        within_tol = abs(predicted_contrib - contrib_amt) <= tol_bound
+
+    # ordered as RES_COLS
+    result = (
+        employee_id,
+        eligible_est,
+        ';'.join(sol['selected']),
+        sol['selected_sum'],
+        sol.get('abs_error'),
+        sol['status'],
+        predicted_contrib,
+        within_tol,
+    )
+    return result, sol['selected']
+
+
+def _row_payloads(chunk: pd.DataFrame, paycode_cols: List[str],
+                  tolerance_pct: float) -> List[Tuple[Any, np.ndarray, Optional[float], int, float, float, float]]:
+    """Build `_solve_row` payloads for a chunk of payroll rows.
+
+    Numeric inputs are extracted and everything row-invariant (cents
+    scaling, eligible_est, tolerance bound) is computed once per chunk,
+    column-wise, so workers only run the solver.
+    """
+    scaled = scale_amounts(_numeric_array(chunk, paycode_cols), SCALE)
+    contrib = _numeric_array(chunk, ['contribution_amount', 'contribution_rate'])
+    amt, rate = contrib[:, 0], contrib[:, 1]
+
+    # rows without an amount or rate are skipped (eligible_est None)
+    solvable = (amt != 0) & (rate != 0)
+    eligible = np.divide(amt, rate, out=np.zeros_like(amt), where=solvable)
+    scaled_target = scale_amounts(eligible, SCALE)
+    tol_bound = np.maximum(tolerance_pct * amt, 1.0)
+    eligible_ests = [e if ok else None for e, ok in zip(eligible.tolist(), solvable.tolist())]
+
+    if 'employee_id' in chunk.columns:
+        employee_ids = chunk['employee_id'].tolist()
+    else:
+        employee_ids = [''] * len(chunk)
+    return list(zip(employee_ids, scaled, eligible_ests, scaled_target.tolist(),
+                    amt.tolist(), rate.tolist(), tol_bound.tolist()))
+
+
+def _csv_chunks(source) -> Iterator[pd.DataFrame]:
+    """Yield a CSV upload in `BATCH_ROWS`-row DataFrames.
+
+    Uses pandas' chunked reader rather than pyarrow's streaming reader, which
+    fixes column types from the first block and rejects later blocks that
+    disagree (e.g. a paycode column that is blank for the first rows).
+    """
+    with pd.read_csv(source, chunksize=BATCH_ROWS) as reader:
+        yield from reader
+
+
+def _stream_solve(chunks: Iterable[pd.DataFrame], res_path: str, tolerance_pct: float,
+                  **solve_kwargs) -> Tuple[Counter, int]:
+    """Blocking helper: solve `chunks` on the worker pool, appending result
+    rows to the CSV at `res_path` as each chunk completes.
+
+    The next chunk is parsed while the pool works through the previous one.
+    Returns (selection counter, total rows).
+    """
+    paycode_cols: List[str] = []
+    solve_row = None
+    counter = Counter()
+    total_rows = 0
+    header = True
+    pending = None
+
+    def flush(solved):
+        nonlocal header
+        results = []
+        for result, selected in solved:
+            counter.update(selected)
+            results.append(result)
+        res_df = pd.DataFrame.from_records(results, columns=RES_COLS).astype(RES_DTYPES)
+        res_df.to_csv(res_path, mode='a', header=header, index=False)
+        header = False
+
+    pool = _get_pool()
+    try:
+        for chunk in chunks:
+            if solve_row is None:
+                # Identify paycode columns (exclude known metadata fields)
+                meta_cols = {'employee_id', 'contribution_amount', 'contribution_rate', 'period'}
+                paycode_cols = [c for c in chunk.columns if c not in meta_cols]
+                solve_row = partial(_solve_row, paycode_cols=paycode_cols, **solve_kwargs)
+            total_rows += len(chunk)
+            # map() submits the whole chunk up front, so workers start on it
+            # while the previous chunk's results are written out below
+            solved = pool.map(solve_row, _row_payloads(chunk, paycode_cols, tolerance_pct), chunksize=BATCH_CHUNKSIZE)
+            if pending is not None:
+                flush(pending)
+            pending = solved
+        if pending is not None:
+            flush(pending)
+    except BrokenProcessPool:
+        # a worker died (solver abort, OOM kill); fail this request only
+        _discard_pool(pool)
+        raise
+    finally:
+        # release a half-read chunk generator while the upload is still open
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+    return counter, total_rows
+
+
+def _write_sheet(workbook: 'xlsxwriter.Workbook', name: str, frames: Iterable[pd.DataFrame]) -> None:
+    """Write DataFrames (header taken from the first) to a new worksheet
+    row by row.
+
+    pandas' `to_excel` emits cells column by column, which xlsxwriter's
+    constant_memory mode silently drops, so rows are written directly.
+    """
+    ws = workbook.add_worksheet(name)
+    r = 0
+    for frame in frames:
+        if r == 0:
+            ws.write_row(0, 0, [str(c) for c in frame.columns])
+            r = 1
+        body = frame.astype(object)
+        for row in body.where(body.notna(), None).itertuples(index=False, name=None):
+            ws.write_row(r, 0, row)
+            r += 1
+
+
 @app.post('/infer_file')
 async def infer_file(file: UploadFile = File(...),
                      format: str = Query('xlsx', enum=['xlsx', 'csv']),
                      time_limit_seconds: float = Query(5.0),
                      max_candidates: int = Query(50),
                      tolerance_pct: float = Query(0.03),
+                     relative_gap_limit: float = Query(0.01),
+                     absolute_gap_scaled: int = Query(100),
                      summary_threshold: float = Query(0.5),
                      background_tasks: BackgroundTasks = None):
     """Accept an uploaded CSV/XLSX of payroll rows, run batch inference and
@@ -183,80 +530,49 @@ async def infer_file(file: UploadFile = File(...),
     Query params:
       - `format`: 'xlsx' (default) or 'csv'
       - `time_limit_seconds`, `max_candidates`, `tolerance_pct`
+      - `relative_gap_limit`, `absolute_gap_scaled`: solver early-stop gaps
+        (absolute gap in cents, default 100 == $1)
       - `summary_threshold`: fraction for suggesting eligible paycodes (default 0.5)
     """
     filename = (file.filename or '').lower()
     if not filename.endswith(('.csv', '.xls', '.xlsx')):
         raise HTTPException(status_code=400, detail='Unsupported file type; only CSV/XLS/XLSX accepted')
 
-    tmp = None
+    res_path = None
     try:
-        with tempfile.NamedTemporaryFile(delete=False) as tmpf:
-            tmp = tmpf.name
-            shutil.copyfileobj(file.file, tmpf)
-
         if filename.endswith('.csv'):
-            df = pd.read_csv(tmp)
+            df = None
+            chunks = _csv_chunks(file.file)
         else:
-            df = pd.read_excel(tmp, engine='openpyxl')
-
-        # Identify paycode columns (exclude known metadata fields)
-        meta_cols = {'employee_id', 'contribution_amount', 'contribution_rate', 'period'}
-        paycode_cols = [c for c in df.columns if c not in meta_cols]
-
-        results = []
-        counter = Counter()
-
-        for _, row in df.iterrows():
-            try:
-                values = {c: float(row.get(c, 0.0) or 0.0) for c in paycode_cols}
-            except Exception:
-                values = {c: 0.0 for c in paycode_cols}
-
-            contrib_amt = float(row.get('contribution_amount') or 0.0)
-            contrib_rate = float(row.get('contribution_rate') or 0.0)
-
-            if contrib_rate == 0 or contrib_amt == 0:
-                eligible_est = None
-                sol = {'status': 'SKIP', 'selected': [], 'selected_sum': 0.0}
-                predicted_contrib = None
-                within_tol = False
-            else:
-                eligible_est = contrib_amt / contrib_rate
-                sol = solve_subset_selection(values, eligible_est, time_limit_seconds=time_limit_seconds, max_candidates=max_candidates)
-                for c in sol.get('selected', []):
-                    counter[c] += 1
-                selected_sum = sol.get('selected_sum', 0.0)
-                predicted_contrib = selected_sum * contrib_rate
-                err = abs(predicted_contrib - contrib_amt)
-                within_tol = (err <= max(tolerance_pct * contrib_amt, 1.0))
-
-            results.append({
-                'employee_id': row.get('employee_id', ''),
-                'eligible_est': eligible_est,
-                'selected': ';'.join(sol.get('selected', [])),
-                'selected_sum': sol.get('selected_sum', 0.0),
-                'abs_error': sol.get('abs_error', None),
-                'solver_status': sol.get('status'),
-                'predicted_contribution': predicted_contrib,
-                'within_tolerance': within_tol,
-            })
-
-        # Build DataFrame for results
-        res_df = pd.DataFrame(results)
+            # Excel has no cheap chunked reader; parse once and slice
+            df = _read_excel(file.file, filename)
+            chunks = (df.iloc[i:i + BATCH_ROWS] for i in range(0, len(df), BATCH_ROWS))
+
+        # Per-employee results are streamed to this CSV chunk by chunk
+        res_tmp = tempfile.NamedTemporaryFile(delete=False, suffix='.csv')
+        res_path = res_tmp.name
+        res_tmp.close()
+
+        # CP-SAT is compute-bound: fan rows out to worker processes and keep
+        # the event loop free while the pool works
+        loop = asyncio.get_running_loop()
+        counter, total_rows = await loop.run_in_executor(
+            None, partial(_stream_solve, chunks, res_path,
+                          time_limit_seconds=time_limit_seconds,
+                          max_candidates=max_candidates,
+                          tolerance_pct=tolerance_pct,
+                          relative_gap_limit=relative_gap_limit,
+                          absolute_gap_scaled=absolute_gap_scaled))
 
         # Build summary
-        total_rows = len(df)
-        summary_rows = [{'paycode': code, 'count': cnt, 'fraction': cnt / total_rows} for code, cnt in counter.items()]
-        summary_df = pd.DataFrame(summary_rows).sort_values('count', ascending=False)
+        summary_df = pd.DataFrame(counter.most_common(), columns=['paycode', 'count'])
+        summary_df['fraction'] = summary_df['count'] / total_rows
         suggested = [code for code, cnt in counter.items() if (cnt / total_rows) >= float(summary_threshold)]
 
         # Write to temp file
         if format == 'csv':
-            out_tmp = tempfile.NamedTemporaryFile(delete=False, suffix='.csv')
-            out_path = out_tmp.name
-            out_tmp.close()
-            res_df.to_csv(out_path, index=False)
+            # the streamed results CSV is the deliverable
+            out_path, res_path = res_path, None
             media_type = 'text/csv'
             out_name = f'results_{os.path.basename(file.filename)}.csv'
             # persist file to results directory with UUID prefix
@@ -275,30 +591,49 @@ async def infer_file(file: UploadFile = File(...),
                 'format': 'csv',
                 'suggested': suggested,
             }
-            with open(os.path.join(RESULTS_DIR, f"{uid}.json"), 'w') as mf:
-                json.dump(meta, mf)
+            with open(os.path.join(RESULTS_DIR, f"{uid}.json"), 'wb') as mf:
+                mf.write(orjson.dumps(meta, option=orjson.OPT_NON_STR_KEYS))
 
             return FileResponse(dest_path, media_type=media_type, filename=out_name)
         else:
             out_tmp = tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx')
             out_path = out_tmp.name
             out_tmp.close()
-            with pd.ExcelWriter(out_path, engine='openpyxl') as writer:
-                # include the original uploaded input as its own sheet
-                try:
-                    df.to_excel(writer, sheet_name='input', index=False)
-                except Exception:
-                    # non-fatal: continue if input cannot be written
-                    pass
-                res_df.to_excel(writer, sheet_name='results', index=False)
-                summary_df.to_excel(writer, sheet_name='summary', index=False)
+            uid = uuid.uuid4().hex
+            input_name = None
+            # constant_memory flushes each row to disk as soon as the next
+            # one starts, instead of holding the workbook in memory
+            with xlsxwriter.Workbook(out_path, XLSX_OPTIONS) as workbook:
+                if total_rows <= INPUT_SHEET_MAX_ROWS:
+                    # include the original uploaded input as its own sheet
+                    try:
+                        if df is None:
+                            file.file.seek(0)
+                            df = _read_csv(file.file)
+                        _write_sheet(workbook, 'input', [df])
+                    except Exception:
+                        # non-fatal: continue if input cannot be written
+                        pass
+                else:
+                    # too large to echo back; keep the upload as-is instead
+                    input_name = f"{uid}_input_{os.path.basename(file.filename)}"
+                    file.file.seek(0)
+                    with open(os.path.join(RESULTS_DIR, input_name), 'wb') as inf:
+                        shutil.copyfileobj(file.file, inf)
+                # one final pass over the streamed results; text columns are
+                # read as-is so numeric-looking paycodes ('101') stay text and
+                # only the other columns treat blanks as missing
+                with pd.read_csv(res_path, chunksize=BATCH_ROWS, dtype=RES_TEXT_DTYPES,
+                                 keep_default_na=False,
+                                 na_values={c: [''] for c in RES_COLS if c not in RES_TEXT_DTYPES}) as res_chunks:
+                    _write_sheet(workbook, 'results', res_chunks)
+                _write_sheet(workbook, 'summary', [summary_df])
                 # also write suggested mapping in a small sheet
-                pd.DataFrame({'suggested': suggested}).to_excel(writer, sheet_name='suggested', index=False)
+                _write_sheet(workbook, 'suggested', [pd.DataFrame({'suggested': suggested})])
 
             media_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
             out_name = f'results_{os.path.basename(file.filename)}.xlsx'
             # persist file to results directory with UUID prefix
-            uid = uuid.uuid4().hex
             dest_name = f"{uid}_{os.path.basename(out_path)}"
             dest_path = os.path.join(RESULTS_DIR, dest_name)
             shutil.move(out_path, dest_path)
@@ -313,8 +648,11 @@ async def infer_file(file: UploadFile = File(...),
                 'format': 'xlsx',
                 'suggested': suggested,
             }
-            with open(os.path.join(RESULTS_DIR, f"{uid}.json"), 'w') as mf:
-                json.dump(meta, mf)
+            if input_name:
+                # original upload kept alongside instead of an 'input' sheet
+                meta['input_stored_name'] = input_name
+            with open(os.path.join(RESULTS_DIR, f"{uid}.json"), 'wb') as mf:
+                mf.write(orjson.dumps(meta, option=orjson.OPT_NON_STR_KEYS))
 
             return FileResponse(dest_path, media_type=media_type, filename=out_name)
 
@@ -323,7 +661,7 @@ async def infer_file(file: UploadFile = File(...),
         raise HTTPException(status_code=500, detail=f'Failed to process file: {e}')
     finally:
         try:
-            if tmp and os.path.exists(tmp):
-                os.unlink(tmp)
+            if res_path and os.path.exists(res_path):
+                os.unlink(res_path)
         except Exception:
             pass
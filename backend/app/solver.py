@@ -2,31 +2,80 @@
 
 This module provides a function to solve the binary subset-selection problem:
   choose x_j in {0,1} to minimize |sum_j x_j * value_j - target|
-with a small secondary objective to prefer fewer selected codes.
+with a secondary objective, solved as a second phase, to prefer fewer
+selected codes.
 
 Notes:
-- Values are scaled to integers (cents) to keep model integer.
+- Values are scaled to integers (cents) to keep model integer; callers pass
+  parallel (names, scaled values) arrays, see `scale_amounts`.
 - Uses CP-SAT with a time limit; objective linearizes the absolute difference.
+- Small problems (<= MITM_MAX_ITEMS candidates) skip CP-SAT and are solved
+  exactly by meet-in-the-middle enumeration over the two halves.
+- Solves are memoized (LRU) on the scaled, ordered values and target, so
+  repeated value patterns across a batch share a single CP-SAT solve.
 """
+import numpy as np
 from ortools.sat.python import cp_model
+from collections import defaultdict
+from functools import lru_cache
 from time import time
-from typing import Dict, List, Tuple
+from typing import Dict, List, Sequence, Tuple
 
 
-def solve_subset_selection(values: Dict[str, float], target: float, *,
+# Largest candidate count solved by meet-in-the-middle instead of CP-SAT;
+# each half enumerates up to 2**(MITM_MAX_ITEMS // 2) subset sums.
+MITM_MAX_ITEMS = 40
+
+# Share of the time limit given to the prefer_fewer phase (fewest codes at the
+# best difference found in phase one)
+PHASE2_TIME_FRACTION = 0.2
+
+_STATUS_MAP = {
+    cp_model.OPTIMAL: 'OPTIMAL',
+    cp_model.FEASIBLE: 'FEASIBLE',
+    cp_model.INFEASIBLE: 'INFEASIBLE',
+    cp_model.UNKNOWN: 'UNKNOWN',
+    cp_model.MODEL_INVALID: 'MODEL_INVALID',
+}
+
+
+def _proven_optimal(solver: cp_model.CpSolver, status: int) -> bool:
+    """CP-SAT also reports OPTIMAL when it stops at a relative/absolute gap
+    limit; only a closed gap (objective == bound) is proven optimal."""
+    return status == cp_model.OPTIMAL and solver.ObjectiveValue() <= solver.BestObjectiveBound()
+
+
+def solve_subset_selection(names: Sequence[str], scaled_vals: np.ndarray, scaled_target: int, *,
                            scale: int = 100,
                            time_limit_seconds: float = 5.0,
                            max_candidates: int = 50,
-                           prefer_fewer: bool = True) -> Dict:
+                           prefer_fewer: bool = True,
+                           num_search_workers: int = 8,
+                           relative_gap_limit: float = 0.01,
+                           absolute_gap_scaled: int = 100) -> Dict:
     """Solve binary selection of pay codes to approximate target.
 
+    Inputs are already scaled to integer units; see `scale_amounts`.
+
     Args:
-        values: mapping paycode -> dollar value (float, >= 0).
-        target: target dollar amount to approximate (float, >= 0).
-        scale: multiplier to convert dollars -> integer units (default cents=100).
+        names: paycode names, parallel to `scaled_vals`.
+        scaled_vals: int64 array of paycode values in scaled units.
+        scaled_target: target amount to approximate, in scaled units.
+        scale: multiplier used to convert dollars -> integer units (default
+            cents=100); only used to report dollar amounts.
         time_limit_seconds: solver time limit.
         max_candidates: if more codes provided, only the largest `max_candidates` are used.
-        prefer_fewer: add small penalty to prefer fewer codes when tie.
+        prefer_fewer: among selections with the best error, return one with
+            the fewest codes. CP-SAT solves this in two phases (error, then
+            code count), giving the second PHASE2_TIME_FRACTION of the time
+            limit.
+        num_search_workers: CP-SAT worker threads; use 1 when already running
+            inside a process pool to avoid oversubscribing cores.
+        relative_gap_limit: stop once (best - bound) / best falls below this.
+        absolute_gap_scaled: stop once the selection is provably within this
+            many scaled units (cents at scale=100) of the best achievable.
+            A solve stopped by either gap limit reports 'FEASIBLE'; 'OPTIMAL'
+            always means proven optimal.
 
     Returns a dict:
         {
@@ -36,31 +85,193 @@ def solve_subset_selection(values: Dict[str, float], target: float, *,
           'target': float,
           'abs_error': float,  # absolute error in dollars
           'scaled_error': int,
-          'solve_time': float (seconds)
+          'solve_time': float (seconds, 0.0 on a cache hit)
+          'num_candidates': int,
+          'cached': bool  # True if served from the solve cache
         }
     """
-    # Filter and sort candidates by absolute value descending
-    items = [(k, float(v)) for k, v in values.items() if float(v) != 0.0]
-    if not items:
-        return {'status': 'INFEASIBLE', 'selected': [], 'selected_sum': 0.0, 'target': target, 'abs_error': target, 'scaled_error': int(round(target * scale)), 'solve_time': 0.0}
+    scaled_vals = np.asarray(scaled_vals, dtype=np.int64)
+    target = scaled_target / float(scale)
+
+    # Drop zero candidates, then order by magnitude descending so that rows
+    # with the same values (under any paycode names) produce the same cache key
+    nz = np.flatnonzero(scaled_vals)
+    if not len(nz):
+        return {'status': 'INFEASIBLE', 'selected': [], 'selected_sum': 0.0, 'target': target, 'abs_error': abs(target), 'scaled_error': abs(scaled_target), 'solve_time': 0.0,
+                'num_candidates': 0, 'cached': False}
+
+    vals = scaled_vals[nz]
+    order = nz[np.lexsort((-vals, -np.abs(vals)))][:max_candidates]
+
+    key_vals = tuple(scaled_vals[order].tolist())
+    scaled_target = int(scaled_target)
+
+    hits_before = _solve_cached.cache_info().hits
+    st, selected_idx, selected_sum_scaled, elapsed = _solve_cached(
+        key_vals, scaled_target, float(time_limit_seconds), bool(prefer_fewer),
+        int(num_search_workers), float(relative_gap_limit), int(absolute_gap_scaled))
+    cached = _solve_cached.cache_info().hits > hits_before
+
+    # remap positional indices back to this row's paycode names
+    selected = [names[order[i]] for i in selected_idx]
+
+    return {
+        'status': st,
+        'selected': selected,
+        'selected_sum': selected_sum_scaled / float(scale),
+        'target': target,
+        'abs_error': abs(selected_sum_scaled - scaled_target) / float(scale),
+        'scaled_error': abs(selected_sum_scaled - scaled_target),
+        'solve_time': 0.0 if cached else elapsed,
+        'num_candidates': len(order),
+        'cached': cached,
+    }
+
+
+def scale_amounts(amounts, scale: int = 100) -> np.ndarray:
+    """Convert dollar amounts (scalar or array-like) to int64 scaled units.
+
+    Raises ValueError on NaN/inf, which would otherwise cast to INT64_MIN;
+    fill blanks (e.g. with 0) before scaling.
+    """
+    arr = np.asarray(amounts, dtype=np.float64)
+    if not np.isfinite(arr).all():
+        raise ValueError('amounts must be finite; fill blank cells before scaling')
+    return np.rint(arr * scale).astype(np.int64)
+
+
+def _greedy_subset_sum(scaled_vals: Tuple[int, ...], scaled_target: int) -> List[int]:
+    """Greedy 0/1 selection approximating `scaled_target`.
+
+    Takes values largest-first while the running sum stays under the target,
+    then applies the best improving single flip or swap until none is left.
+    """
+    n = len(scaled_vals)
+    pick = [0] * n
+    total = 0
+    for i in sorted(range(n), key=lambda i: scaled_vals[i], reverse=True):
+        if total + scaled_vals[i] <= scaled_target:
+            pick[i] = 1
+            total += scaled_vals[i]
+
+    for _ in range(n):
+        best_err = abs(total - scaled_target)
+        best_move = None
+        for i in range(n):
+            delta = -scaled_vals[i] if pick[i] else scaled_vals[i]
+            if abs(total + delta - scaled_target) < best_err:
+                best_err, best_move = abs(total + delta - scaled_target), (i,)
+            if not pick[i]:
+                continue
+            for j in range(n):
+                if pick[j]:
+                    continue
+                delta = scaled_vals[j] - scaled_vals[i]
+                if abs(total + delta - scaled_target) < best_err:
+                    best_err, best_move = abs(total + delta - scaled_target), (i, j)
+        if best_move is None:
+            break
+        for i in best_move:
+            total += -scaled_vals[i] if pick[i] else scaled_vals[i]
+            pick[i] ^= 1
+
+    return pick
+
+
+def _half_sums(vals: Tuple[int, ...]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Enumerate all 2**len(vals) subset sums of `vals` by doubling.
+
+    Returns parallel int64 arrays (sums, popcounts, masks), where bit `k` of a
+    mask means `vals[k]` is selected.
+    """
+    sums = np.zeros(1, dtype=np.int64)
+    counts = np.zeros(1, dtype=np.int64)
+    masks = np.zeros(1, dtype=np.int64)
+    for k, v in enumerate(vals):
+        sums = np.concatenate([sums, sums + v])
+        counts = np.concatenate([counts, counts + 1])
+        masks = np.concatenate([masks, masks | (1 << k)])
+    return sums, counts, masks
+
 
-    items.sort(key=lambda kv: abs(kv[1]), reverse=True)
-    if len(items) > max_candidates:
-        items = items[:max_candidates]
+def _mitm_subset_sum(scaled_vals: Tuple[int, ...], scaled_target: int,
+                     prefer_fewer: bool) -> List[int]:
+    """Exact subset sum closest to `scaled_target` by meet-in-the-middle.
+
+    Enumerates both halves' subset sums, sorts the left half and uses
+    `searchsorted` to find the nearest complement of every right-half sum at
+    once. Ties are broken by fewest selected items when `prefer_fewer`.
+    Returns a 0/1 list.
+    """
+    n = len(scaled_vals)
+    k = n // 2
+    l_sums, l_counts, l_masks = _half_sums(scaled_vals[:k])
+    r_sums, r_counts, r_masks = _half_sums(scaled_vals[k:])
 
-    names = [k for k, _ in items]
-    vals = [v for _, v in items]
+    # sort left by (sum, popcount) and keep the fewest-item mask per sum;
+    # popcount <= k, so sum * (k + 1) + popcount orders lexicographically
+    order = np.argsort(l_sums * (k + 1) + l_counts)
+    l_sums, first = np.unique(l_sums[order], return_index=True)
+    l_counts = l_counts[order][first]
+    l_masks = l_masks[order][first]
 
-    scaled_vals = [int(round(v * scale)) for v in vals]
-    scaled_target = int(round(target * scale))
+    # nearest left sums just below and at/above each right complement
+    idx = np.searchsorted(l_sums, scaled_target - r_sums)
+    cand = np.stack([(idx - 1).clip(0, len(l_sums) - 1), idx.clip(0, len(l_sums) - 1)])
+    err = np.abs(l_sums[cand] + r_sums - scaled_target).ravel()
+
+    best = int(err.argmin())
+    if prefer_fewer:
+        ties = np.flatnonzero(err == err[best])
+        best = int(ties[(l_counts[cand] + r_counts).ravel()[ties].argmin()])
+    side, ri = divmod(best, len(r_sums))
+    mask = int(l_masks[cand[side, ri]]) | (int(r_masks[ri]) << k)
+
+    return [(mask >> i) & 1 for i in range(n)]
+
+
+@lru_cache(maxsize=4096)
+def _solve_cached(scaled_vals: Tuple[int, ...], scaled_target: int,
+                  time_limit_seconds: float, prefer_fewer: bool,
+                  num_search_workers: int, relative_gap_limit: float,
+                  absolute_gap_scaled: int) -> Tuple[str, Tuple[int, ...], int, float]:
+    """Build and solve the CP-SAT model for an already scaled, ordered problem.
+
+    Keyed purely on positional values so structurally identical rows share one
+    solve. Returns (status, selected indices, selected scaled sum, solve time).
+    """
+    n = len(scaled_vals)
+
+    if n <= MITM_MAX_ITEMS:
+        # small enough to enumerate exactly; cheaper than building a model
+        start = time()
+        pick = _mitm_subset_sum(scaled_vals, scaled_target, prefer_fewer)
+        elapsed = time() - start
+        selected_idx = tuple(i for i in range(n) if pick[i])
+        return 'OPTIMAL', selected_idx, sum(scaled_vals[i] for i in selected_idx), elapsed
 
     model = cp_model.CpModel()
 
-    x_vars = [model.NewBoolVar(f'x_{i}') for i in range(len(names))]
+    # Collapse codes with equal values into one count variable per distinct
+    # value (c_j in [0, multiplicity]); equal codes are interchangeable, so
+    # this only removes symmetric branches
+    positions = defaultdict(list)  # value -> indices into scaled_vals
+    for i, v in enumerate(scaled_vals):
+        positions[v].append(i)
+    bucket_vals = list(positions)
+    m = len(bucket_vals)
+    c_vars = [model.NewIntVar(0, len(positions[v]), f'c_{j}') for j, v in enumerate(bucket_vals)]
 
-    # sum_x = sum(x_i * scaled_vals_i)
+    # sum_x = sum(c_j * bucket_vals_j)
     sum_var = model.NewIntVar(0, sum(scaled_vals), 'sum_selected')
-    model.Add(sum_var == sum(x_vars[i] * scaled_vals[i] for i in range(len(names))))
+    model.Add(sum_var == sum(c_vars[j] * bucket_vals[j] for j in range(m)))
+
+    # Warm start from a greedy solution; CP-SAT uses it as its first incumbent.
+    # Any 0/1 hint is feasible, so repair_hint is not set (with several
+    # workers and absolute_gap_limit it aborts CP-SAT's fixed_search check)
+    hint = _greedy_subset_sum(scaled_vals, scaled_target)
+    for j, v in enumerate(bucket_vals):
+        model.AddHint(c_vars[j], sum(hint[i] for i in positions[v]))
 
     # absolute difference linearization: diff >= sum - target ; diff >= target - sum
     max_diff = max(scaled_target, sum(scaled_vals))
@@ -68,51 +279,50 @@ def solve_subset_selection(values: Dict[str, float], target: float, *,
     model.Add(sum_var - scaled_target <= diff)
     model.Add(scaled_target - sum_var <= diff)
 
-    # Objective: minimize diff primarily, optionally prefer fewer codes
-    # Use a large multiplier to prioritize diff over number of codes
-    LARGE = max(10**6, scaled_target + 1)
-    if prefer_fewer:
-        # minimize LARGE * diff + sum(x)
-        obj_terms = []
-        obj_terms.append(diff * LARGE)
-        obj_terms.extend(x_vars)
-        model.Minimize(sum(obj_terms))
-    else:
-        model.Minimize(diff)
+    # Objective, lexicographically: minimize diff first, then (with
+    # prefer_fewer) minimize the number of codes with diff pinned at its
+    # optimum. Two small objectives bound far tighter than one weighted sum.
+    model.Minimize(diff)
 
     solver = cp_model.CpSolver()
-    solver.parameters.max_time_in_seconds = float(time_limit_seconds)
-    solver.parameters.num_search_workers = 8
+    phase1_time = time_limit_seconds * (1.0 - PHASE2_TIME_FRACTION) if prefer_fewer else time_limit_seconds
+    solver.parameters.max_time_in_seconds = float(phase1_time)
+    solver.parameters.num_search_workers = num_search_workers
+    # return a near-optimal selection instead of spending the time limit
+    # proving optimality
+    solver.parameters.relative_gap_limit = relative_gap_limit
+    solver.parameters.absolute_gap_limit = float(absolute_gap_scaled)
 
     start = time()
     status = solver.Solve(model)
-    elapsed = time() - start
 
-    status_map = {
-        cp_model.OPTIMAL: 'OPTIMAL',
-        cp_model.FEASIBLE: 'FEASIBLE',
-        cp_model.INFEASIBLE: 'INFEASIBLE',
-        cp_model.UNKNOWN: 'UNKNOWN',
-        cp_model.MODEL_INVALID: 'MODEL_INVALID',
-    }
+    found = (cp_model.OPTIMAL, cp_model.FEASIBLE)
+    if status not in found:
+        return _STATUS_MAP.get(status, 'UNKNOWN'), (), 0, time() - start
+    if not _proven_optimal(solver, status):
+        status = cp_model.FEASIBLE
+    counts = [solver.Value(c_vars[j]) for j in range(m)]
 
-    st = status_map.get(status, 'UNKNOWN')
+    if prefer_fewer:
+        model.Add(diff <= int(solver.Value(diff)))
+        model.Minimize(sum(c_vars))
+        # restart from the phase-one selection
+        model.ClearHints()
+        for j in range(m):
+            model.AddHint(c_vars[j], counts[j])
+        solver.parameters.max_time_in_seconds = float(time_limit_seconds * PHASE2_TIME_FRACTION)
+        solver.parameters.absolute_gap_limit = 0.0
+        status2 = solver.Solve(model)
+        if status2 in found:
+            counts = [solver.Value(c_vars[j]) for j in range(m)]
+            if not _proven_optimal(solver, status2):
+                status = cp_model.FEASIBLE
+    elapsed = time() - start
 
-    selected = []
-    for i, name in enumerate(names):
-        if solver.Value(x_vars[i]) == 1:
-            selected.append(name)
+    st = _STATUS_MAP.get(status, 'UNKNOWN')
 
-    selected_sum_scaled = sum(solver.Value(x_vars[i]) * scaled_vals[i] for i in range(len(names)))
-    abs_error = abs(selected_sum_scaled - scaled_target) / float(scale)
+    # expand counts back to codes: the first c_j positions holding each value
+    selected_idx = tuple(sorted(i for j, v in enumerate(bucket_vals) for i in positions[v][:counts[j]]))
+    selected_sum_scaled = sum(scaled_vals[i] for i in selected_idx)
 
-    return {
-        'status': st,
-        'selected': selected,
-        'selected_sum': selected_sum_scaled / float(scale),
-        'target': target,
-        'abs_error': abs_error,
-        'scaled_error': abs(selected_sum_scaled - scaled_target),
-        'solve_time': elapsed,
-        'num_candidates': len(names),
-    }
+    return st, selected_idx, selected_sum_scaled, elapsed
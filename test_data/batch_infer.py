@@ -6,7 +6,7 @@ import pandas as pd
 REPO = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(REPO))
 
-from backend.app.solver import solve_subset_selection
+from backend.app.solver import solve_subset_selection, scale_amounts
 
 CSV = Path(__file__).parent / 'sample_payroll.csv'
 
@@ -14,12 +14,14 @@ df = pd.read_csv(CSV)
 
 paycode_cols = [c for c in df.columns if c not in ('employee_id','contribution_amount','contribution_rate','period')]
 
+# paycode values as int cents, one row per employee (blank cells count as 0)
+scaled = scale_amounts(df[paycode_cols].fillna(0).to_numpy(dtype=float))
+
 results = []
 from collections import Counter
 counter = Counter()
 
 for i, row in df.iterrows():
-    values = {c: float(row[c]) for c in paycode_cols}
     contrib_amt = float(row['contribution_amount'])
     contrib_rate = float(row['contribution_rate'])
     if contrib_rate == 0:
@@ -27,9 +29,8 @@ for i, row in df.iterrows():
         sol = {'status':'SKIP','selected':[]}
     else:
         eligible_est = contrib_amt / contrib_rate
-        sol = solve_subset_selection(values, eligible_est, time_limit_seconds=2.0, max_candidates=20)
-        for c in sol.get('selected',[]):
-            counter[c] += 1
+        sol = solve_subset_selection(paycode_cols, scaled[i], int(round(eligible_est * 100)), time_limit_seconds=2.0, max_candidates=20)
+        counter.update(sol.get('selected', ()))
     results.append({'employee_id': row.get('employee_id',''), 'eligible_est': eligible_est, 'solver': sol})
 
 # print per-employee results
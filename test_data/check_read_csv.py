@@ -0,0 +1,29 @@
+"""Check that the upload CSV reader parses the sample files like pandas does
+
+Run:
+    python3 test_data/check_read_csv.py
+
+sample_payroll_dates.csv has ISO date/datetime `period` values, which pyarrow
+would otherwise infer as date/timestamp columns and break the /upload preview.
+"""
+import sys
+import json
+from pathlib import Path
+import pandas as pd
+
+# ensure repo root on path
+REPO = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO))
+
+from backend.app.main import _read_csv
+
+for name in ('sample_payroll.csv', 'sample_payroll_dates.csv'):
+    path = Path(__file__).parent / name
+    df = _read_csv(str(path))
+    pd.testing.assert_frame_equal(df, pd.read_csv(path), check_dtype=False)
+
+    # built the same way as the /upload preview; must serialize to JSON
+    head = df.head(5).astype(object)
+    preview = head.where(head.notna(), '').to_dict(orient='records')
+    json.dumps(preview)
+    print('OK', name, list(df.columns))